@@ -1,15 +1,34 @@
 from fastapi import FastAPI, BackgroundTasks, HTTPException, Body
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import List, Optional
 import os
+import re
+import signal
 import subprocess
 import json
-import shutil
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import asynccontextmanager
 from datetime import datetime
+from functools import lru_cache
+from threading import Condition, Event, Lock, Timer
 
-app = FastAPI(title="Akhi Data Builder API")
+# orjson is optional; it parses and serializes the LoRA JSON several times faster than json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create output directories once when the server starts rather than on import
+    ensure_directories()
+    yield
+
+app = FastAPI(title="Akhi Data Builder API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -26,6 +45,40 @@ OUTPUT_DIR = os.path.join(PIPELINE_DIR, "output")
 CLIPS_DIR = os.path.join(OUTPUT_DIR, "clips")
 TRANSCRIPTS_DIR = os.path.join(OUTPUT_DIR, "transcripts")
 JSON_DIR = os.path.join(OUTPUT_DIR, "json")
+JSON_FILE = os.path.join(JSON_DIR, "akhi_lora.json")
+
+# yt-dlp records downloaded video IDs here and skips them on later runs;
+# kept with the clips so /api/reset clears both together
+DOWNLOAD_ARCHIVE = os.path.join(CLIPS_DIR, "download_archive.txt")
+
+# Download parallelism: yt-dlp processes run at once, and fragments fetched per video
+MAX_DOWNLOAD_WORKERS = 8
+DOWNLOAD_FRAGMENTS = 8
+
+# Adaptive download concurrency: start low, add a slot after a run of successes,
+# halve on HTTP 429 or 5xx and retry the throttled link after an exponential backoff
+INITIAL_DOWNLOAD_WORKERS = 2
+DOWNLOAD_RAMP_UP_SUCCESSES = 3
+DOWNLOAD_RETRIES = 3
+DOWNLOAD_BACKOFF_SECONDS = 5
+
+# yt-dlp output: pass --verbose for debugging, and lines kept per video for error messages
+YTDLP_VERBOSE = False
+DOWNLOAD_OUTPUT_TAIL = 50
+
+# Longest a single yt-dlp process may run before it is killed
+DOWNLOAD_TIMEOUT_SECONDS = 3600
+
+# Whisper device: "auto" uses CUDA when a GPU is visible, or force "cuda" / "cpu";
+# a compute type of None picks one to suit the device (e.g. "int8", "float16", "int8_float16")
+WHISPER_DEVICE = "auto"
+WHISPER_COMPUTE_TYPE = None
+
+# Number of audio chunks decoded per batch by the Whisper model
+WHISPER_BATCH_SIZE = 8
+
+# Beam width for Whisper decoding: 1 is greedy and fastest, 5 trades speed for accuracy
+WHISPER_BEAM_SIZE = 1
 
 # Global transcription status tracking
 transcription_status = {
@@ -49,10 +102,19 @@ json_generation_status = {
     "last_updated": None
 }
 
-# Create directories if they don't exist
-os.makedirs(CLIPS_DIR, exist_ok=True)
-os.makedirs(TRANSCRIPTS_DIR, exist_ok=True)
-os.makedirs(JSON_DIR, exist_ok=True)
+# Parsed akhi_lora.json, keyed by the file's (mtime, size) so repeated reads are free
+json_output_cache = {
+    "stamp": None,
+    "data": None
+}
+
+# Serializes Whisper model loads so overlapping transcription runs share one copy of the weights
+whisper_model_lock = Lock()
+
+# Create directories if they don't exist; run at startup and by the tasks that write into them
+def ensure_directories():
+    for dir_path in [CLIPS_DIR, TRANSCRIPTS_DIR, JSON_DIR]:
+        os.makedirs(dir_path, exist_ok=True)
 
 # Models
 class VideoLink(BaseModel):
@@ -66,53 +128,237 @@ class TranscriptEdit(BaseModel):
     file_name: str
     content: str
 
+# Helpers
+def list_files(dir_path: str, suffix: str):
+    """Names of files in dir_path ending with suffix; nothing if the directory doesn't exist yet"""
+    try:
+        names = os.listdir(dir_path)
+    except FileNotFoundError:
+        return
+    for name in names:
+        if name.endswith(suffix):
+            yield name
+
+def load_json_output():
+    """Load akhi_lora.json, re-parsing it only when the file has changed on disk"""
+    st = os.stat(JSON_FILE)
+    stamp = (st.st_mtime_ns, st.st_size)
+    
+    if json_output_cache["stamp"] != stamp:
+        with open(JSON_FILE, "rb") as f:
+            raw = f.read()
+        data = orjson.loads(raw) if orjson else json.loads(raw)
+        json_output_cache.update({"stamp": stamp, "data": data})
+    
+    return json_output_cache["data"]
+
+@lru_cache(maxsize=2)
+def load_whisper_model(model_size: str, device: str, compute_type: str, device_count: int = 1):
+    """Load a Whisper model once and keep it resident across transcription runs"""
+    # Import faster-whisper here to avoid import errors if not installed
+    from faster_whisper import WhisperModel
+    
+    # A device_index list loads one replica per GPU, so concurrent transcribe() calls run on
+    # separate devices; num_workers stays 1 because it adds replicas on every listed device
+    device_index = list(range(device_count)) if device == "cuda" else 0
+    
+    # On CPU use one thread per physical core, unless OMP_NUM_THREADS is set (cpu_threads=0 defers to it)
+    cpu_threads = 0
+    if device == "cpu" and "OMP_NUM_THREADS" not in os.environ:
+        cpu_threads = physical_cpu_count()
+    
+    return WhisperModel(model_size, device=device, device_index=device_index,
+                        compute_type=compute_type, cpu_threads=cpu_threads, num_workers=1)
+
+def physical_cpu_count():
+    """Number of physical CPU cores, falling back to logical CPUs without psutil"""
+    try:
+        import psutil
+        cores = psutil.cpu_count(logical=False)
+    except ImportError:
+        cores = None
+    
+    return cores or os.cpu_count() or 4
+
+def dump_json_entry(entry: dict) -> str:
+    """Serialize one LoRA entry with indent=2, using orjson when available"""
+    if orjson:
+        return orjson.dumps(entry, option=orjson.OPT_INDENT_2).decode("utf-8")
+    return json.dumps(entry, indent=2, ensure_ascii=False)
+
+def select_whisper_device():
+    """Pick the Whisper device, compute type and device count from WHISPER_DEVICE/WHISPER_COMPUTE_TYPE"""
+    if WHISPER_DEVICE == "cpu":
+        return "cpu", WHISPER_COMPUTE_TYPE or "int8", 1
+    
+    # ctranslate2 is installed with faster-whisper, so import it lazily as well
+    import ctranslate2
+    
+    cuda_devices = ctranslate2.get_cuda_device_count()
+    if cuda_devices > 0 or WHISPER_DEVICE == "cuda":
+        compute_type = WHISPER_COMPUTE_TYPE
+        if compute_type is None:
+            # int8_float16 needs Tensor Cores; older GPUs fall back to float16
+            supported = ctranslate2.get_supported_compute_types("cuda") if cuda_devices else set()
+            compute_type = "int8_float16" if "int8_float16" in supported else "float16"
+        return "cuda", compute_type, max(cuda_devices, 1)
+    
+    return "cpu", WHISPER_COMPUTE_TYPE or "int8", 1
+
+class DownloadLimiter:
+    """Caps concurrent yt-dlp processes, growing the cap additively and halving it when throttled"""
+    
+    def __init__(self, limit: int, max_limit: int):
+        self.limit = limit
+        self.max_limit = max_limit
+        self.active = 0
+        self.successes = 0
+        self.condition = Condition()
+    
+    def acquire(self):
+        with self.condition:
+            while self.active >= self.limit:
+                self.condition.wait()
+            self.active += 1
+    
+    def release(self, succeeded: bool, throttled: bool):
+        with self.condition:
+            self.active -= 1
+            if throttled:
+                self.limit = max(1, self.limit // 2)
+                self.successes = 0
+                print(f"Throttled by YouTube, reducing parallel downloads to {self.limit}")
+            elif succeeded:
+                self.successes += 1
+                if self.successes >= DOWNLOAD_RAMP_UP_SUCCESSES and self.limit < self.max_limit:
+                    self.limit += 1
+                    self.successes = 0
+                    print(f"Increasing parallel downloads to {self.limit}")
+            self.condition.notify_all()
+
+# yt-dlp reports HTTP failures as "HTTP Error <code>: <reason>"
+THROTTLE_ERROR = re.compile(r"HTTP Error (429|5\d\d)\b")
+
+def is_throttled(result: subprocess.CompletedProcess) -> bool:
+    # yt-dlp logs and retries transient 429s on its own, so only a failed run counts
+    return result.returncode != 0 and THROTTLE_ERROR.search(result.stdout) is not None
+
+def kill_process_group(process: subprocess.Popen):
+    """Kill a process started with start_new_session=True along with any children it spawned"""
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except ProcessLookupError:
+        pass
+
 # Background tasks
-def download_videos(links: List[str]):
-    # Write links to temporary file
-    links_file = os.path.join(PIPELINE_DIR, "temp_links.txt")
-    with open(links_file, "w") as f:
-        for link in links:
-            f.write(f"{link}\n")
+def download_video_limited(limiter: DownloadLimiter, link: str):
+    for attempt in range(DOWNLOAD_RETRIES + 1):
+        limiter.acquire()
+        result = None
+        try:
+            result = download_video(link)
+        finally:
+            succeeded = result is not None and result.returncode == 0
+            throttled = result is not None and is_throttled(result)
+            limiter.release(succeeded, throttled)
+        
+        if not throttled or attempt == DOWNLOAD_RETRIES:
+            return result
+        
+        delay = DOWNLOAD_BACKOFF_SECONDS * 2 ** attempt
+        print(f"Retrying {link} in {delay}s after an HTTP 429/5xx error")
+        time.sleep(delay)
+
+def download_video(link: str):
+    # Use the parameters that we've confirmed work with the upgraded yt-dlp
+    command = [
+        "yt-dlp", link,
+        "-f", "ba",  # Best audio format
+        "-x",  # Extract audio
+        "--audio-format", "mp3", 
+        "--audio-quality", "0",
+        "--concurrent-fragments", str(DOWNLOAD_FRAGMENTS),  # Fetch fragments of a single video in parallel
+        "--no-playlist", 
+        "--no-progress",  # Progress bars are most of yt-dlp's output and aren't needed in logs
+        "--download-archive", DOWNLOAD_ARCHIVE,  # Skip videos downloaded by an earlier run
+        "--no-check-certificate",
+        "--geo-bypass",
+        "-o", f"{CLIPS_DIR}/%(title)s.%(ext)s"
+    ]
+    if YTDLP_VERBOSE:
+        command.append("--verbose")
+    
+    # Stream output line by line instead of buffering it until the process exits,
+    # keeping only the tail for error reporting
+    # Run yt-dlp in its own session so it can be killed together with its ffmpeg children
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1,
+                               start_new_session=True)
+    output_tail = deque(maxlen=DOWNLOAD_OUTPUT_TAIL)
     
+    # Kill downloads that hang so they can't hold a worker slot forever
+    timed_out = Event()
+    def stop_on_timeout():
+        timed_out.set()
+        kill_process_group(process)
+    
+    watchdog = Timer(DOWNLOAD_TIMEOUT_SECONDS, stop_on_timeout)
+    watchdog.start()
+    try:
+        for line in process.stdout:
+            line = line.rstrip()
+            print(f"[yt-dlp] {line}")
+            output_tail.append(line)
+        returncode = process.wait()
+    finally:
+        watchdog.cancel()
+        # Only still running if reading the output failed; don't leave it orphaned
+        if process.poll() is None:
+            kill_process_group(process)
+            process.wait()
+        process.stdout.close()
+    
+    if timed_out.is_set():
+        output_tail.append(f"yt-dlp was stopped after {DOWNLOAD_TIMEOUT_SECONDS}s timeout")
+    
+    return subprocess.CompletedProcess(command, returncode, stdout="\n".join(output_tail))
+
+def download_videos(links: List[str]):
     try:
-        # Run yt-dlp command with better error handling and debugging
+        ensure_directories()
+        
+        # Drop repeated links (keeping order): parallel yt-dlp processes for the same
+        # video would write to the same output file at once and corrupt it
+        links = list(dict.fromkeys(links))
+        
+        # Run one yt-dlp process per link so independent downloads overlap
         print(f"Starting download of {len(links)} videos with yt-dlp")
         print(f"Clips directory: {CLIPS_DIR}")
         print(f"Links: {links}")
         
-        # Use the parameters that we've confirmed work with the upgraded yt-dlp
-        result = subprocess.run([
-            "yt-dlp", "-a", links_file, 
-            "-f", "ba",  # Best audio format
-            "-x",  # Extract audio
-            "--audio-format", "mp3", 
-            "--audio-quality", "0",
-            "--no-playlist", 
-            "--verbose", 
-            "--no-check-certificate",
-            "--geo-bypass",
-            "-o", f"{CLIPS_DIR}/%(title)s.%(ext)s"
-        ], capture_output=True, text=True, check=False)  # Changed to check=False to handle errors manually
+        max_workers = min(MAX_DOWNLOAD_WORKERS, len(links))
+        limiter = DownloadLimiter(min(INITIAL_DOWNLOAD_WORKERS, max_workers), max_workers)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(lambda link: download_video_limited(limiter, link), links))
         
-        # Check if the command was successful
-        if result.returncode == 0:
+        # Check if every command was successful
+        failed = [result for result in results if result.returncode != 0]
+        if not failed:
             print(f"Videos downloaded successfully")
-            print(f"yt-dlp output: {result.stdout}")
             return "Videos downloaded successfully"
         else:
+            output = "\n".join(result.stdout for result in failed)
             # Handle specific error cases
-            if "HTTP Error 403: Forbidden" in result.stderr:
+            if "HTTP Error 403: Forbidden" in output:
                 error_message = "YouTube is blocking the download. This is a common issue with YouTube's restrictions."
-                print(f"YouTube blocking error: {result.stderr}")
+                print(f"YouTube blocking error: {output}")
                 raise Exception(error_message)
             else:
-                error_message = f"Error running yt-dlp (code {result.returncode}):\nOutput: {result.stdout}\nError: {result.stderr}"
-                print(error_message)
-                raise Exception(f"Error downloading videos: {result.stderr}")
-    except subprocess.CalledProcessError as e:
-        error_message = f"Error running yt-dlp: {e}\nOutput: {e.stdout}\nError: {e.stderr}"
-        print(error_message)
-        raise Exception(f"Error downloading videos: {e.stderr}")
+                for result in failed:
+                    print(f"Error running yt-dlp (code {result.returncode}):\nOutput: {result.stdout}")
+                raise Exception(f"Error downloading {len(failed)}/{len(links)} videos: {output}")
     except Exception as e:
         if str(e).startswith("YouTube is blocking"):
             # Pass through our custom error message
@@ -120,17 +366,35 @@ def download_videos(links: List[str]):
         error_message = f"Unexpected error downloading videos: {str(e)}"
         print(error_message)
         raise Exception(error_message)
-    finally:
-        # Clean up
-        if os.path.exists(links_file):
-            os.remove(links_file)
+
+def transcribe_file(transcriber, file: str, transcribe_options: dict):
+    # Update current file status
+    transcription_status.update({
+        "current_file": file,
+        "last_updated": datetime.now().isoformat()
+    })
+    
+    print(f"Transcribing file: {file}")
+    file_path = os.path.join(CLIPS_DIR, file)
+    
+    # Transcribe using faster-whisper Python API
+    segments, info = transcriber.transcribe(file_path, beam_size=WHISPER_BEAM_SIZE, **transcribe_options)
+    
+    # Collect all transcribed text in one join instead of re-concatenating per segment
+    transcribed_text = " ".join(segment.text for segment in segments)
+    
+    # Save transcription to text file
+    base_name = os.path.splitext(file)[0]
+    transcript_file = os.path.join(TRANSCRIPTS_DIR, f"{base_name}.txt")
+    
+    with open(transcript_file, "w", encoding="utf-8") as f:
+        f.write(transcribed_text.strip())
 
 def transcribe_audio():
     global transcription_status
     
     try:
-        # Import faster-whisper here to avoid import errors if not installed
-        from faster_whisper import WhisperModel
+        ensure_directories()
         
         # Reset and initialize transcription status
         transcription_status.update({
@@ -143,10 +407,9 @@ def transcribe_audio():
         })
         
         # Get all MP3 files
-        mp3_files = [f for f in os.listdir(CLIPS_DIR) if f.endswith(".mp3")]
-        total_files = len(mp3_files)
+        mp3_files = list(list_files(CLIPS_DIR, ".mp3"))
         
-        if total_files == 0:
+        if not mp3_files:
             transcription_status.update({
                 "is_running": False,
                 "error": "No MP3 files found in clips directory",
@@ -155,57 +418,81 @@ def transcribe_audio():
             print("No MP3 files found for transcription")
             return
         
+        # Skip files that already have a transcript so reruns only do new work
+        transcribed = {os.path.splitext(f)[0] for f in list_files(TRANSCRIPTS_DIR, ".txt")}
+        mp3_files = [f for f in mp3_files if os.path.splitext(f)[0] not in transcribed]
+        total_files = len(mp3_files)
+        
+        if total_files == 0:
+            transcription_status.update({
+                "is_running": False,
+                "total_files": 0,
+                "progress": 100,
+                "last_updated": datetime.now().isoformat()
+            })
+            print("All MP3 files already have transcripts")
+            return
+        
         transcription_status["total_files"] = total_files
         print(f"Starting transcription of {total_files} files")
         
-        # Initialize the Whisper model
-        model = WhisperModel("base", device="cpu", compute_type="int8")
-        
-        # Transcribe each file
-        for i, file in enumerate(mp3_files):
+        # Initialize the Whisper model on the fastest available device
+        device, compute_type, device_count = select_whisper_device()
+        print(f"Loading Whisper model on {device_count} {device} device(s) ({compute_type})")
+        with whisper_model_lock:
             try:
-                # Update current file status
-                transcription_status.update({
-                    "current_file": file,
-                    "progress": int((i / total_files) * 100),
-                    "last_updated": datetime.now().isoformat()
-                })
-                
-                print(f"Transcribing file {i+1}/{total_files}: {file}")
-                file_path = os.path.join(CLIPS_DIR, file)
-                
-                # Transcribe using faster-whisper Python API
-                segments, info = model.transcribe(file_path, beam_size=5)
-                
-                # Collect all transcribed text
-                transcribed_text = ""
-                for segment in segments:
-                    transcribed_text += segment.text + " "
-                
-                # Save transcription to text file
-                base_name = os.path.splitext(file)[0]
-                transcript_file = os.path.join(TRANSCRIPTS_DIR, f"{base_name}.txt")
-                
-                with open(transcript_file, "w", encoding="utf-8") as f:
-                    f.write(transcribed_text.strip())
-                
-                # Update completed files count
-                transcription_status.update({
-                    "completed_files": i + 1,
-                    "progress": int(((i + 1) / total_files) * 100),
-                    "last_updated": datetime.now().isoformat()
-                })
-                
-                print(f"Successfully transcribed: {file}")
-                
+                model = load_whisper_model("base", device, compute_type, device_count)
+            except ImportError:
+                raise
             except Exception as e:
-                error_msg = f"Unexpected error transcribing {file}: {str(e)}"
-                print(error_msg)
-                transcription_status.update({
-                    "error": error_msg,
-                    "last_updated": datetime.now().isoformat()
-                })
-                continue
+                # e.g. an NVIDIA driver without the cuBLAS/cuDNN runtime; CPU still works there
+                if device != "cuda":
+                    raise
+                print(f"Could not load Whisper model on CUDA ({str(e)}), falling back to CPU (int8)")
+                device, compute_type, device_count = "cpu", "int8", 1
+                model = load_whisper_model("base", device, compute_type, device_count)
+        
+        # Decode each file's audio chunks in batches when faster-whisper supports it
+        try:
+            from faster_whisper import BatchedInferencePipeline
+            transcriber = BatchedInferencePipeline(model=model)
+            transcribe_options = {"batch_size": WHISPER_BATCH_SIZE}
+        except ImportError:
+            # Match the batched pipeline: skip silence via VAD and decode each window
+            # independently, so one bad decode can't cascade into the next
+            transcriber = model
+            transcribe_options = {"vad_filter": True, "condition_on_previous_text": False}
+        
+        # Transcribe files in parallel, one worker per model replica (one replica per GPU)
+        completed_files = 0
+        with ThreadPoolExecutor(max_workers=device_count) as executor:
+            futures = {
+                executor.submit(transcribe_file, transcriber, file, transcribe_options): file
+                for file in mp3_files
+            }
+            for future in as_completed(futures):
+                file = futures[future]
+                try:
+                    future.result()
+                    
+                    # Update completed files count
+                    completed_files += 1
+                    transcription_status.update({
+                        "completed_files": completed_files,
+                        "progress": int((completed_files / total_files) * 100),
+                        "last_updated": datetime.now().isoformat()
+                    })
+                    
+                    print(f"Successfully transcribed {completed_files}/{total_files}: {file}")
+                    
+                except Exception as e:
+                    error_msg = f"Unexpected error transcribing {file}: {str(e)}"
+                    print(error_msg)
+                    transcription_status.update({
+                        "error": error_msg,
+                        "last_updated": datetime.now().isoformat()
+                    })
+                    continue
         
         # Mark transcription as complete
         transcription_status.update({
@@ -238,6 +525,8 @@ def generate_json():
     global json_generation_status
     
     try:
+        ensure_directories()
+        
         # Initialize status
         json_generation_status.update({
             "is_running": True,
@@ -250,7 +539,7 @@ def generate_json():
         })
         
         # Count transcript files
-        transcript_files = [f for f in os.listdir(TRANSCRIPTS_DIR) if f.endswith(".txt")]
+        transcript_files = list(list_files(TRANSCRIPTS_DIR, ".txt"))
         total_files = len(transcript_files)
         
         if total_files == 0:
@@ -263,32 +552,43 @@ def generate_json():
             "last_updated": datetime.now().isoformat()
         })
         
-        # Process files manually for better progress tracking
-        results = []
-        for i, file in enumerate(transcript_files):
-            json_generation_status.update({
-                "current_step": f"Processing {file}",
-                "processed_files": i,
-                "progress": 10 + int((i / total_files) * 80),  # 10-90% for processing
-                "last_updated": datetime.now().isoformat()
-            })
-            
-            try:
-                file_path = os.path.join(TRANSCRIPTS_DIR, file)
-                with open(file_path, "r", encoding="utf-8") as f:
-                    content = f.read().strip()
-                    
-                # Only include files with substantial content
-                if len(content.split()) > 50:
-                    results.append({
-                        "instruction": "Summarize and offer Islamic advice based on this:",
-                        "input": content,
-                        "output": "Remember, Allah is always with those who are patient and sincere."
-                    })
-                    
-            except Exception as e:
-                print(f"Error processing {file}: {str(e)}")
-                continue
+        # Process files manually for better progress tracking, streaming each entry
+        # to a temp file instead of collecting them all in memory first
+        temp_file_path = f"{JSON_FILE}.tmp"
+        entry_count = 0
+        
+        with open(temp_file_path, "w", encoding="utf-8") as out:
+            out.write("[")
+            for i, file in enumerate(transcript_files):
+                json_generation_status.update({
+                    "current_step": f"Processing {file}",
+                    "processed_files": i,
+                    "progress": 10 + int((i / total_files) * 80),  # 10-90% for processing
+                    "last_updated": datetime.now().isoformat()
+                })
+                
+                try:
+                    file_path = os.path.join(TRANSCRIPTS_DIR, file)
+                    with open(file_path, "r", encoding="utf-8") as f:
+                        content = f.read().strip()
+                        
+                    # Only include files with substantial content; maxsplit stops
+                    # after the 51st word instead of splitting the whole transcript
+                    if len(content.split(maxsplit=50)) > 50:
+                        entry = {
+                            "instruction": "Summarize and offer Islamic advice based on this:",
+                            "input": content,
+                            "output": "Remember, Allah is always with those who are patient and sincere."
+                        }
+                        # Same layout as json.dump(results, indent=2)
+                        out.write(",\n  " if entry_count else "\n  ")
+                        out.write(dump_json_entry(entry).replace("\n", "\n  "))
+                        entry_count += 1
+                        
+                except Exception as e:
+                    print(f"Error processing {file}: {str(e)}")
+                    continue
+            out.write("\n]" if entry_count else "]")
         
         # Update progress for saving
         json_generation_status.update({
@@ -298,10 +598,8 @@ def generate_json():
             "last_updated": datetime.now().isoformat()
         })
         
-        # Save the JSON file
-        json_file_path = os.path.join(JSON_DIR, "akhi_lora.json")
-        with open(json_file_path, "w", encoding="utf-8") as f:
-            json.dump(results, f, indent=2, ensure_ascii=False)
+        # Swap the finished file into place so readers never see a partial JSON file
+        os.replace(temp_file_path, JSON_FILE)
         
         # Mark as complete
         json_generation_status.update({
@@ -311,7 +609,7 @@ def generate_json():
             "last_updated": datetime.now().isoformat()
         })
         
-        print(f"JSON generation completed. Generated {len(results)} entries from {total_files} transcript files.")
+        print(f"JSON generation completed. Generated {entry_count} entries from {total_files} transcript files.")
         
     except Exception as e:
         error_msg = f"Error generating JSON: {str(e)}"
@@ -347,8 +645,9 @@ async def download_videos_endpoint(request_data: dict = Body(...)):
         if not links:
             raise ValueError("No valid links provided")
             
-        # Run synchronously for better error handling
-        result = download_videos(links)
+        # Wait for the result for better error handling, but off the event loop
+        # so other requests (e.g. status polling) are served meanwhile
+        result = await run_in_threadpool(download_videos, links)
         return {"message": result}
     except Exception as e:
         # Return error with status code 500
@@ -369,21 +668,17 @@ async def create_json(background_tasks: BackgroundTasks):
 @app.get("/api/status")
 def get_status():
     # Count files in each directory
-    clips_count = len([f for f in os.listdir(CLIPS_DIR) if f.endswith(".mp3")])
-    transcripts_count = len([f for f in os.listdir(TRANSCRIPTS_DIR) if f.endswith(".txt")])
+    clips_count = sum(1 for f in list_files(CLIPS_DIR, ".mp3"))
+    transcripts_count = sum(1 for f in list_files(TRANSCRIPTS_DIR, ".txt"))
     
     # Check if JSON exists
-    json_file = os.path.join(JSON_DIR, "akhi_lora.json")
-    json_exists = os.path.exists(json_file)
+    json_exists = True
     json_count = 0
     
-    if json_exists:
-        with open(json_file, "r") as f:
-            try:
-                data = json.load(f)
-                json_count = len(data)
-            except json.JSONDecodeError:
-                json_exists = False
+    try:
+        json_count = len(load_json_output())
+    except (FileNotFoundError, json.JSONDecodeError):
+        json_exists = False
     
     return {
         "clips": clips_count,
@@ -407,60 +702,65 @@ def get_json_generation_status():
 @app.get("/api/transcripts")
 def list_transcripts():
     transcripts = []
-    for file in os.listdir(TRANSCRIPTS_DIR):
-        if file.endswith(".txt"):
-            file_path = os.path.join(TRANSCRIPTS_DIR, file)
-            with open(file_path, "r") as f:
-                content = f.read()
-                word_count = len(content.split())
-                transcripts.append({
-                    "file_name": file,
-                    "word_count": word_count,
-                    "preview": content[:200] + "..." if len(content) > 200 else content
-                })
+    for file in list_files(TRANSCRIPTS_DIR, ".txt"):
+        file_path = os.path.join(TRANSCRIPTS_DIR, file)
+        with open(file_path, "r") as f:
+            content = f.read()
+            word_count = len(content.split())
+            transcripts.append({
+                "file_name": file,
+                "word_count": word_count,
+                "preview": content[:200] + "..." if len(content) > 200 else content
+            })
     
     return {"transcripts": transcripts}
 
 @app.get("/api/transcripts/{file_name}")
 def get_transcript(file_name: str):
     file_path = os.path.join(TRANSCRIPTS_DIR, file_name)
-    if not os.path.exists(file_path):
+    try:
+        with open(file_path, "r") as f:
+            content = f.read()
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Transcript not found")
     
-    with open(file_path, "r") as f:
-        content = f.read()
-    
     return {"file_name": file_name, "content": content}
 
 @app.post("/api/transcripts/{file_name}")
 def update_transcript(file_name: str, transcript: TranscriptEdit):
     file_path = os.path.join(TRANSCRIPTS_DIR, file_name)
-    if not os.path.exists(file_path):
+    try:
+        # "r+" only opens existing files, so the open doubles as the existence check
+        with open(file_path, "r+") as f:
+            # Skip the rewrite when the editor saves unchanged content
+            if f.read() != transcript.content:
+                f.seek(0)
+                f.write(transcript.content)
+                f.truncate()
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Transcript not found")
     
-    with open(file_path, "w") as f:
-        f.write(transcript.content)
-    
     return {"msg": "Transcript updated successfully"}
 
 @app.get("/api/json")
 def get_json():
-    json_file = os.path.join(JSON_DIR, "akhi_lora.json")
-    if not os.path.exists(json_file):
+    try:
+        data = load_json_output()
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="JSON file not found")
     
-    with open(json_file, "r") as f:
-        data = json.load(f)
-    
     return {"data": data}
 
 @app.delete("/api/reset")
 def reset_data():
     # Clear all directories
     for dir_path in [CLIPS_DIR, TRANSCRIPTS_DIR, JSON_DIR]:
-        for file in os.listdir(dir_path):
-            file_path = os.path.join(dir_path, file)
-            if os.path.isfile(file_path):
-                os.remove(file_path)
+        if not os.path.isdir(dir_path):
+            continue
+        # scandir reports the file type from the directory listing, avoiding a stat per entry
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    os.remove(entry.path)
     
     return {"msg": "All data has been reset"}
@@ -1,16 +1,42 @@
 import os, json, sys
+from concurrent.futures import ThreadPoolExecutor
 
-results = []
-for file in os.listdir(sys.argv[1]):
-    if file.endswith(".txt"):
-        with open(os.path.join(sys.argv[1], file)) as f:
-            content = f.read().strip()
-            if len(content.split()) > 50:
-                results.append({
+# orjson is optional; it serializes entries several times faster than json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Transcripts read concurrently; also the most file contents held in memory at once
+READ_WORKERS = 16
+
+def dump(record):
+    if orjson:
+        return orjson.dumps(record, option=orjson.OPT_INDENT_2).decode("utf-8")
+    return json.dumps(record, indent=2)
+
+def load(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read().strip()
+
+paths = [entry.path for entry in os.scandir(sys.argv[1]) if entry.name.endswith(".txt")]
+
+# Write each entry into the JSON array as soon as it is built instead of collecting them all first
+count = 0
+with open("output/json/akhi_lora.json", "w", encoding="utf-8") as o, ThreadPoolExecutor(max_workers=READ_WORKERS) as ex:
+    o.write("[")
+    for i in range(0, len(paths), READ_WORKERS):
+        for content in ex.map(load, paths[i:i + READ_WORKERS]):
+            # maxsplit stops after the 51st word instead of splitting the whole transcript
+            if len(content.split(maxsplit=50)) > 50:
+                record = {
                     "instruction": "Summarize and offer Islamic advice based on this:",
                     "input": content,
                     "output": "Remember, Allah is always with those who are patient and sincere."
-                })
-
-with open("output/json/akhi_lora.json", "w") as o:
-    json.dump(results, o, indent=2)
+                }
+                # Same indented layout as json.dump(results, o, indent=2); with orjson, non-ASCII text is
+                # written as raw UTF-8 rather than \u escapes, so the JSON is equal but not byte-identical
+                o.write(",\n  " if count else "\n  ")
+                o.write(dump(record).replace("\n", "\n  "))
+                count += 1
+    o.write("\n]" if count else "]")